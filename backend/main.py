@@ -1,30 +1,41 @@
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Any, Optional
 import os
 import re
-import httpx
-import base64
+import io
+import aiohttp
+import asyncio
+import orjson
+import pybase64
+import xxhash
+from cachetools import TTLCache
+from PIL import Image
 import logging
 import traceback
-
-# Basic logging to stdout for easier debugging in dev (use DEBUG to show tracebacks)
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s %(levelname)s %(message)s")
+from dotenv import load_dotenv
+# Before anything reads the environment, so backend/.env applies to logging too
+load_dotenv()
+
+# Basic logging to stdout (set LOG_LEVEL=DEBUG to show tracebacks)
+LOG_LEVEL = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper())
+logging.basicConfig(
+    # getLevelName returns a string for unknown names; fall back to INFO
+    level=LOG_LEVEL if isinstance(LOG_LEVEL, int) else logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s",
+)
 logger = logging.getLogger(__name__)
 
-from backend.utils.interview_files import load_interviews, save_interviews
-from backend.utils.transcript import save_audio_file, generate_transcript
+from backend.utils import interview_store as store
+from backend.utils.transcript import save_audio_file, submit_transcript, warm
 from backend.utils.analyze import analyze_guilt, analyze_summary
 
 # =====================================================
 # APP INIT (MUST BE FIRST)
 # =====================================================
 
-app = FastAPI()
-
-
-@app.on_event("startup")
-def log_routes_on_startup():
+def log_routes(app: FastAPI):
     logger.info("Registered routes:")
     try:
         for route in app.router.routes:
@@ -32,12 +43,38 @@ def log_routes_on_startup():
             path = getattr(route, "path", None) or getattr(route, "name", str(route))
             logger.info("  %s %s", ",".join(methods) if methods else "--", path)
     except Exception:
-        logger.debug("Failed to list routes: %s", traceback.format_exc())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Failed to list routes: %s", traceback.format_exc())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_routes(app)
+    # One pooled client for the whole process so upstream calls reuse
+    # keep-alive connections instead of paying a TCP+TLS handshake each time.
+    app.state.http = aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=30),
+        connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60),
+    )
+    # Load and warm Whisper once at startup so the first upload doesn't pay
+    # for it. Failures are not fatal here; add_interview reports them per request.
+    try:
+        await asyncio.wrap_future(warm())
+    except Exception as e:
+        logger.error("startup: whisper preload failed: %s", e)
+    try:
+        yield
+    finally:
+        await app.state.http.close()
+
 
+# Endpoints declare their return types, so FastAPI validates and serializes
+# responses through Pydantic's Rust core (ORJSONResponse is deprecated).
+app = FastAPI(lifespan=lifespan)
 
 
-# Middleware to log every incoming request (helps diagnose 404s/CORS)
-@app.middleware("http")
+# Middleware to log every incoming request (helps diagnose 404s/CORS).
+# Only installed with LOG_HTTP=1 so normal runs don't pay for it per request.
 async def log_requests(request: Request, call_next):
     try:
         logger.info("incoming request: %s %s", request.method, request.url.path)
@@ -46,10 +83,14 @@ async def log_requests(request: Request, call_next):
         if origin:
             logger.info("  Origin: %s", origin)
     except Exception:
-        logger.debug("Failed to log incoming request: %s", traceback.format_exc())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Failed to log incoming request: %s", traceback.format_exc())
     response = await call_next(request)
     return response
 
+if os.getenv("LOG_HTTP") == "1":
+    app.middleware("http")(log_requests)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -71,27 +112,103 @@ HACKCLUB_API_KEY = os.getenv("HACKCLUB_AI_KEY")
 if not HACKCLUB_API_KEY:
     print("[WARN] HACKCLUB_AI_KEY not set")
 
+# Upload caps keep per-request memory bounded; oversized bodies get a 413.
+MAX_FRAME_BYTES = int(os.getenv("MAX_FRAME_BYTES", 10 * 1024 * 1024))
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", 200 * 1024 * 1024))
+
+
+async def read_upload(file: UploadFile, limit: int) -> bytes:
+    """Read an upload, refusing anything over `limit` bytes without buffering it all."""
+    if file.size is not None and file.size > limit:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {limit} bytes")
+    content = await file.read(limit + 1)
+    if len(content) > limit:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {limit} bytes")
+    return content
+
 # =====================================================
 # VIDEO FEEDBACK (VISION MODEL)
 # =====================================================
 
+# Recent feedback keyed by a hash of (goal, frame). Consecutive webcam frames
+# are frequently identical, and the model's tips would be the same anyway.
+feedback_cache = TTLCache(maxsize=256, ttl=120)
+
+
+def frame_cache_key(goal: str, img_bytes: bytes) -> str:
+    # Length-prefix the goal so ("ab", b"c") and ("a", b"bc") hash differently
+    goal_b = goal.encode("utf-8")
+    h = xxhash.xxh3_64(len(goal_b).to_bytes(4, "little") + goal_b)
+    h.update(img_bytes)
+    return h.hexdigest()
+
+
+# The vision model only needs enough resolution to judge lighting and framing.
+FRAME_MAX_EDGE = 512
+FRAME_JPEG_QUALITY = 80
+# Decoding is checked against this before any pixels are read: a tiny PNG can
+# declare a huge canvas, and thumbnail() would allocate all of it first.
+FRAME_MAX_PIXELS = 4096 * 4096
+
+
+def shrink_frame(img_bytes: bytes, content_type: str):
+    """Downscale a frame to FRAME_MAX_EDGE and re-encode it as JPEG.
+    Returns (bytes, content_type); frames that are already small JPEGs, that
+    exceed FRAME_MAX_PIXELS or that Pillow can't decode are passed through
+    unchanged.
+    """
+    try:
+        img = Image.open(io.BytesIO(img_bytes))
+        if img.width * img.height > FRAME_MAX_PIXELS:
+            logger.info("shrink_frame: %dx%d frame too large to decode", img.width, img.height)
+            return img_bytes, content_type
+        if img.format == "JPEG" and max(img.size) <= FRAME_MAX_EDGE:
+            return img_bytes, content_type
+        img.thumbnail((FRAME_MAX_EDGE, FRAME_MAX_EDGE))
+        buf = io.BytesIO()
+        img.convert("RGB").save(buf, "JPEG", quality=FRAME_JPEG_QUALITY)
+        return buf.getvalue(), "image/jpeg"
+    except Exception as e:
+        logger.info("shrink_frame: sending original frame: %s", e)
+        return img_bytes, content_type
+
+
+def encode_frame(img_bytes: bytes, content_type: str) -> str:
+    return build_data_url(*shrink_frame(img_bytes, content_type))
+
+
+def build_data_url(img_bytes: bytes, content_type: str) -> str:
+    """Encode an image as a data URL, building it as bytes and decoding once."""
+    prefix = f"data:{content_type};base64,".encode("ascii")
+    return (prefix + pybase64.b64encode(memoryview(img_bytes))).decode("ascii")
+
+
 @app.post("/video-feedback")
 async def video_feedback(
+    request: Request,
     file: UploadFile = File(...),
     goal: str = Form(
         "Give camera/communication feedback for an interview. Avoid judging guilt."
     ),
-):
+) -> dict[str, Any]:
     if not HACKCLUB_API_KEY:
         logger.error("video_feedback: Missing HACKCLUB_AI_KEY")
         raise HTTPException(status_code=500, detail="Missing HACKCLUB_AI_KEY")
 
-    img_bytes = await file.read()
+    img_bytes = await read_upload(file, MAX_FRAME_BYTES)
     if not img_bytes:
         raise HTTPException(status_code=400, detail="Empty image upload")
 
-    b64 = base64.b64encode(img_bytes).decode("utf-8")
-    data_url = f"data:{file.content_type or 'image/jpeg'};base64,{b64}"
+    cache_key = frame_cache_key(goal, img_bytes)
+    cached = feedback_cache.get(cache_key)
+    if cached is not None:
+        logger.info("video_feedback: cache hit")
+        return {"feedback": cached}
+
+    # Off the event loop so large frames don't stall other requests
+    data_url = await asyncio.to_thread(
+        encode_frame, img_bytes, file.content_type or "image/jpeg"
+    )
 
     payload = {
         "model": "qwen/qwen3-vl-235b-a22b-instruct",
@@ -117,23 +234,25 @@ async def video_feedback(
     }
 
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            r = await client.post(
-                HACKCLUB_PROXY_URL,
-                headers={
-                    "Authorization": f"Bearer {HACKCLUB_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
+        async with request.app.state.http.post(
+            HACKCLUB_PROXY_URL,
+            headers={
+                "Authorization": f"Bearer {HACKCLUB_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            data=orjson.dumps(payload),
+        ) as r:
             r.raise_for_status()
-            data = r.json()
+            data = await r.json(loads=orjson.loads)
 
         logger.info("video_feedback: received response from model proxy")
-        return {"feedback": data["choices"][0]["message"]["content"]}
+        feedback = data["choices"][0]["message"]["content"]
+        feedback_cache[cache_key] = feedback
+        return {"feedback": feedback}
     except Exception as e:
         logger.error("video_feedback: exception: %s", e)
-        logger.debug(traceback.format_exc())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(traceback.format_exc())
         raise HTTPException(status_code=502, detail=str(e))
 
 # =====================================================
@@ -141,49 +260,35 @@ async def video_feedback(
 # =====================================================
 
 @app.get("/interviews")
-def get_interviews():
-    interviews = load_interviews()
-    if isinstance(interviews, list):
-        return [iv for iv in interviews if isinstance(iv, dict) and iv.get("name")]
-    return interviews
+def get_interviews() -> list[dict[str, Any]]:
+    return store.list_all()
 
 
 @app.post("/interview")
 async def add_interview(
     name: str = Form(...),
     file: UploadFile = File(...),
-):
+) -> dict[str, str]:
     logger.info("add_interview: start for name=%s filename=%s", name, getattr(file, 'filename', None))
-    content = await file.read()
+    content = await read_upload(file, MAX_AUDIO_BYTES)
     if not content:
         logger.error("add_interview: empty upload for %s", name)
         raise HTTPException(status_code=400, detail="Empty audio file")
 
-    file_path, safe_filename = save_audio_file(name, content)
+    # Transcribe straight from the uploaded bytes while the copy kept for
+    # playback is written to disk, rather than re-reading the saved file.
+    transcript_future = submit_transcript(content)
+    file_path, safe_filename = await asyncio.to_thread(save_audio_file, name, content)
 
     try:
-        transcript_text = generate_transcript(file_path)
+        transcript_text = await asyncio.wrap_future(transcript_future)
     except Exception as e:
         logger.error("add_interview: transcription failed for %s: %s", name, e)
-        logger.debug(traceback.format_exc())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Transcription failed: {e}")
 
-    interviews = load_interviews()
-    if not isinstance(interviews, list):
-        interviews = []
-
-    interviews = [iv for iv in interviews if iv.get("name") != name]
-
-    interviews.append(
-        {
-            "name": name,
-            "mp3_path": file_path,
-            "guilt_level": -1,
-            "transcript": transcript_text,
-        }
-    )
-
-    save_interviews(interviews)
+    await asyncio.to_thread(store.upsert, name, file_path, -1, transcript_text)
     logger.info("add_interview: saved interview %s", name)
 
     return {
@@ -193,33 +298,31 @@ async def add_interview(
     }
 
 
+def remove_audio_files(interviews):
+    for iv in interviews:
+        if iv.get("mp3_path") and os.path.exists(iv["mp3_path"]):
+            os.remove(iv["mp3_path"])
+
+
 @app.delete("/interview/{name}")
-async def delete_interview(name: str):
-    interviews = load_interviews()
-    interview = next((iv for iv in interviews if iv.get("name") == name), None)
+async def delete_interview(name: str) -> dict[str, str]:
+    interview = await asyncio.to_thread(store.get, name)
 
     if not interview:
         raise HTTPException(status_code=404, detail="Interview not found")
 
-    if interview.get("mp3_path") and os.path.exists(interview["mp3_path"]):
-        os.remove(interview["mp3_path"])
-
-    interviews = [iv for iv in interviews if iv.get("name") != name]
-    save_interviews(interviews)
+    await asyncio.to_thread(remove_audio_files, [interview])
+    await asyncio.to_thread(store.delete, name)
 
     logger.info("delete_interview: deleted %s", name)
     return {"message": f"Interview '{name}' deleted"}
 
 
 @app.delete("/interviews/reset")
-async def reset_interviews():
-    interviews = load_interviews()
-
-    for iv in interviews:
-        if iv.get("mp3_path") and os.path.exists(iv["mp3_path"]):
-            os.remove(iv["mp3_path"])
-
-    save_interviews([])
+async def reset_interviews() -> dict[str, str]:
+    interviews = await asyncio.to_thread(store.list_all)
+    await asyncio.to_thread(remove_audio_files, interviews)
+    await asyncio.to_thread(store.clear)
     logger.info("reset_interviews: removed all interviews")
     return {"message": "All interviews deleted"}
 
@@ -228,7 +331,9 @@ async def reset_interviews():
 # =====================================================
 
 @app.post("/analyze")
-async def analyze_guilt_endpoint(request: Request, name: str = Form(None)):
+@app.post("/analyze/", include_in_schema=False)
+async def analyze_guilt_endpoint(request: Request, name: str = Form(None)) -> dict[str, Any]:
+    """Also served at /analyze/ to accept trailing-slash POSTs from clients."""
     # Support both form-encoded and JSON payloads from the frontend.
     if not name:
         try:
@@ -237,80 +342,44 @@ async def analyze_guilt_endpoint(request: Request, name: str = Form(None)):
         except Exception:
             pass
 
-    interviews = load_interviews()
-    interview = next((iv for iv in interviews if iv.get("name") == name), None)
+    interview = await asyncio.to_thread(store.get, name)
 
     if not interview or not interview.get("transcript"):
         logger.error("analyze_guilt: transcript not found for %s", name)
         raise HTTPException(status_code=404, detail="Transcript not found")
 
     try:
-        guilt_level = analyze_guilt(interview["transcript"])
+        guilt_level = await analyze_guilt(request.app.state.http, interview["transcript"])
     except Exception as e:
         logger.error("analyze_guilt: analyze_guilt failed for %s: %s", name, e)
-        logger.debug(traceback.format_exc())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
-    interview["guilt_level"] = guilt_level
-    save_interviews(interviews)
+    await asyncio.to_thread(store.set_guilt_level, name, guilt_level)
 
     logger.info("analyze_guilt: computed guilt=%s for %s", guilt_level, name)
     return {"name": name, "guilt_level": guilt_level}
 
 
 @app.get("/summary")
-async def summary_endpoint():
-    interviews = load_interviews()
-    valid = [iv for iv in interviews if iv.get("transcript")]
+async def summary_endpoint(request: Request) -> dict[str, Any]:
+    valid = await asyncio.to_thread(store.iter_with_transcripts)
 
     if not valid:
         logger.error("summary_endpoint: no transcripts available")
         raise HTTPException(status_code=400, detail="No transcripts")
 
-    prompt = "Transcripts:\n"
-    for iv in valid:
-        prompt += f"\nName: {iv['name']}\nTranscript: {iv['transcript']}\n"
+    parts = ["Transcripts:\n"]
+    parts.extend(f"\nName: {iv['name']}\nTranscript: {iv['transcript']}\n" for iv in valid)
+    prompt = "".join(parts)
 
-    result = analyze_summary(prompt)
+    result = await analyze_summary(request.app.state.http, prompt)
     logger.info("summary_endpoint: summary computed")
     return {"summary": result}
 
 
-
-@app.post("/analyze/")
-async def analyze_guilt_endpoint_slash(request: Request, name: str = Form(None)):
-    """Alias for /analyze to accept trailing-slash POSTs from clients."""
-    # Support both form-encoded and JSON payloads from the frontend.
-    if not name:
-        try:
-            body = await request.json()
-            name = body.get("name")
-        except Exception:
-            pass
-
-    interviews = load_interviews()
-    interview = next((iv for iv in interviews if iv.get("name") == name), None)
-
-    if not interview or not interview.get("transcript"):
-        logger.error("analyze_guilt_slash: transcript not found for %s", name)
-        raise HTTPException(status_code=404, detail="Transcript not found")
-
-    try:
-        guilt_level = analyze_guilt(interview["transcript"])
-    except Exception as e:
-        logger.error("analyze_guilt_slash: analyze_guilt failed for %s: %s", name, e)
-        logger.debug(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
-
-    interview["guilt_level"] = guilt_level
-    save_interviews(interviews)
-
-    logger.info("analyze_guilt_slash: computed guilt=%s for %s", guilt_level, name)
-    return {"name": name, "guilt_level": guilt_level}
-
-
-
 @app.get("/ping")
-def ping():
+def ping() -> dict[str, str]:
     """Simple health check endpoint."""
     return {"status": "ok"}
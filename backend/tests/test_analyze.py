@@ -0,0 +1,191 @@
+import asyncio
+import gc
+
+import pytest
+
+from backend.utils import analyze
+from backend.utils.analyze import (
+    HACKCLUB_CONTENT_PATH,
+    _parse_summary,
+    _parse_truncated_json,
+    _read_first,
+)
+
+SUMMARY = '{"ranking": [{"name": "A", "rank": 1, "reason": "alibi"}], "summary": "ok"}'
+
+
+def test_complete_json():
+    parsed, clean = _parse_summary(SUMMARY)
+    assert parsed["summary"] == "ok"
+    assert clean
+
+
+def test_trailing_text_keeps_document():
+    assert _parse_summary(SUMMARY + "\nHope this helps!")[0]["summary"] == "ok"
+
+
+def test_extra_closing_brace_keeps_document():
+    assert _parse_summary(SUMMARY + "}")[0]["summary"] == "ok"
+
+
+def test_trailing_comma_keeps_summary():
+    text = '{"ranking": [{"name": "A", "rank": 1, "reason": "alibi"},], "summary": "ok",}'
+    parsed, clean = _parse_summary(text)
+    assert parsed["summary"] == "ok"
+    assert not clean
+    assert [item["name"] for item in parsed["ranking"]] == ["A"]
+
+
+def test_truncated_ranking_drops_partial_item():
+    text = (
+        '{"ranking": [{"name": "A", "rank": 1, "reason": "alibi"}, '
+        '{"name": "B", "rank": 2, "rea'
+    )
+    parsed, clean = _parse_summary(text)
+    assert not clean
+    assert parsed["ranking"] == [{"name": "A", "rank": 1, "reason": "alibi"}]
+
+
+def test_truncated_mid_string_is_closed():
+    parsed = _parse_truncated_json('{"summary": "cut of')
+    assert parsed == {"summary": "cut of"}
+
+
+def test_fenced_json():
+    assert _parse_summary("```json\n" + SUMMARY + "\n```")[0]["summary"] == "ok"
+
+
+def test_plain_text_is_returned_as_is():
+    assert _parse_summary("  No suspects stand out.  ") == ("No suspects stand out.", False)
+
+
+class _Stream:
+    """Minimal stand-in for aiohttp's StreamReader, served in small chunks."""
+
+    def __init__(self, data, chunk=8):
+        self.data = data
+        self.chunk = chunk
+        self.pos = 0
+
+    async def read(self, n=-1):
+        end = len(self.data) if n < 0 else self.pos + min(n, self.chunk)
+        out = self.data[self.pos:end]
+        self.pos += len(out)
+        return out
+
+
+class _Response:
+    def __init__(self, body):
+        self.content = _Stream(body)
+
+
+def test_read_first_drains_body():
+    response = _Response(b'{"choices": [{"message": {"content": "7"}}], "usage": {"total_tokens": 42}}')
+    assert asyncio.run(_read_first(response, HACKCLUB_CONTENT_PATH)) == "7"
+    assert response.content.pos == len(response.content.data)
+
+
+def test_read_first_missing_path():
+    with pytest.raises(ValueError):
+        asyncio.run(_read_first(_Response(b'{"error": "nope"}'), HACKCLUB_CONTENT_PATH))
+
+
+def _provider(calls, name, delay=0, result=None, error=None):
+    async def ask(session, system_prompt, user_content, timeout):
+        calls.append(name)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            calls.append(name + " cancelled")
+            raise
+        if error:
+            raise error
+        return result
+    return ask
+
+
+def _hedge(monkeypatch, hackclub, gemini, hedge_delay=0.05):
+    monkeypatch.setattr(analyze, "HEDGE_DELAY", hedge_delay)
+    monkeypatch.setattr(analyze, "_ask_hackclub", hackclub)
+    monkeypatch.setattr(analyze, "_ask_gemini", gemini)
+    return asyncio.run(analyze._ask_first_success("test", "prompt", "text", None, 1))
+
+
+def test_hedge_fast_success_skips_gemini(monkeypatch):
+    calls = []
+    result = _hedge(
+        monkeypatch,
+        _provider(calls, "hackclub", result="42"),
+        _provider(calls, "gemini", result="7"),
+    )
+    assert result == ("Hackclub", "42")
+    assert calls == ["hackclub"]
+
+
+def test_hedge_slow_primary_lets_gemini_win(monkeypatch):
+    calls = []
+    result = _hedge(
+        monkeypatch,
+        _provider(calls, "hackclub", delay=1, result="42"),
+        _provider(calls, "gemini", result="7"),
+    )
+    assert result == ("Gemini", "7")
+    assert "hackclub cancelled" in calls
+
+
+def test_hedge_fast_failure_asks_gemini_immediately(monkeypatch):
+    calls = []
+    result = _hedge(
+        monkeypatch,
+        _provider(calls, "hackclub", error=ValueError("boom")),
+        _provider(calls, "gemini", result="7"),
+        hedge_delay=5,
+    )
+    assert result == ("Gemini", "7")
+
+
+def test_hedge_both_failing_raises(monkeypatch):
+    calls = []
+    with pytest.raises(RuntimeError, match="Both Hackclub and Gemini"):
+        _hedge(
+            monkeypatch,
+            _provider(calls, "hackclub", delay=0.1, error=ValueError("boom")),
+            _provider(calls, "gemini", error=RuntimeError("no key")),
+        )
+
+
+def test_hedge_retrieves_failure_finished_with_success(monkeypatch, caplog):
+    errors = []
+    monkeypatch.setattr(analyze, "HEDGE_DELAY", 0.01)
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, ctx: errors.append(ctx))
+        for _ in range(20):
+            both = asyncio.Event()
+
+            async def hackclub(*args):
+                await both.wait()
+                raise ValueError("boom")
+
+            async def gemini(*args):
+                both.set()
+                return "7"
+
+            # Both finish in the same wait() round; set order decides which is seen first
+            monkeypatch.setattr(analyze, "_ask_hackclub", hackclub)
+            monkeypatch.setattr(analyze, "_ask_gemini", gemini)
+            assert await analyze._ask_first_success("test", "prompt", "text", None, 1) == ("Gemini", "7")
+        gc.collect()
+
+    asyncio.run(run())
+    assert errors == []
+    assert caplog.text.count("Hackclub request failed: boom") == 20
+
+
+def test_empty_hackclub_reply_is_a_failure(monkeypatch):
+    async def post(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(analyze, "_post_with_retry", post)
+    with pytest.raises(ValueError):
+        asyncio.run(analyze._ask_hackclub(None, analyze.PROMPT_GUILT_SYSTEM, "text", 1))
@@ -0,0 +1,58 @@
+import pytest
+
+from backend.utils import cache_utils
+
+
+@pytest.fixture(autouse=True)
+def temp_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_utils, "CACHE_DB", str(tmp_path / "llm_cache.db"))
+    monkeypatch.setattr(cache_utils, "_conn", None)
+    yield
+    if cache_utils._conn is not None:
+        cache_utils._conn.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_utils.time, "time", lambda: now[0])
+    return now
+
+
+def _keys():
+    return {row[0] for row in cache_utils._conn.execute("SELECT key FROM llm_cache")}
+
+
+def test_round_trip():
+    cache_utils.save_cached("k", {"summary": "ok", "ranking": []})
+    assert cache_utils.get_cached("k") == {"summary": "ok", "ranking": []}
+    assert cache_utils.get_cached("missing") is None
+
+
+def test_expired_entry_is_a_miss_and_pruned(clock, monkeypatch):
+    monkeypatch.setattr(cache_utils, "TTL_SECONDS", 10)
+    cache_utils.save_cached("old", 1)
+    clock[0] += 11
+    assert cache_utils.get_cached("old") is None
+
+    cache_utils.save_cached("new", 2)
+    assert _keys() == {"new"}
+
+
+def test_least_recently_used_is_evicted(clock, monkeypatch):
+    monkeypatch.setattr(cache_utils, "MAX_ENTRIES", 2)
+    cache_utils.save_cached("a", 1)
+    clock[0] += 1
+    cache_utils.save_cached("b", 2)
+    clock[0] += 1
+    assert cache_utils.get_cached("a") == 1  # touch: b is now the oldest
+    clock[0] += 1
+    cache_utils.save_cached("c", 3)
+
+    assert _keys() == {"a", "c"}
+
+
+def test_cache_key_is_stable():
+    messages = [{"role": "user", "content": "hi"}]
+    assert cache_utils.cache_key("m", messages) == cache_utils.cache_key("m", list(messages))
+    assert cache_utils.cache_key("m", messages) != cache_utils.cache_key("other", messages)
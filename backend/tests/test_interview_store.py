@@ -0,0 +1,90 @@
+import sqlite3
+
+import orjson
+import pytest
+
+from backend.utils import interview_files
+from backend.utils import interview_store as store
+
+
+@pytest.fixture(autouse=True)
+def temp_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "DB_FILE", str(tmp_path / "interviews.db"))
+    monkeypatch.setattr(store, "DATA_FILE", str(tmp_path / "interviews.json"))
+    monkeypatch.setattr(interview_files, "DATA_FILE", str(tmp_path / "interviews.json"))
+    monkeypatch.setattr(store, "_conn", None)
+    monkeypatch.setattr(store, "_rows_cache", None)
+    monkeypatch.setattr(store, "_rows_version", None)
+    yield tmp_path
+    if store._conn is not None:
+        store._conn.close()
+
+
+def _names():
+    return [iv["name"] for iv in store.list_all()]
+
+
+def test_migrates_legacy_json_and_renames_it(temp_store):
+    legacy = temp_store / "interviews.json"
+    legacy.write_bytes(orjson.dumps([
+        {"name": "alice", "mp3_path": "a.mp3", "guilt_level": 40, "transcript": "hi"},
+        {"name": "bob", "transcript": "yo"},
+        {"transcript": "no name, skipped"},
+    ]))
+
+    assert store.list_all() == [
+        {"name": "alice", "mp3_path": "a.mp3", "guilt_level": 40, "transcript": "hi"},
+        {"name": "bob", "mp3_path": None, "guilt_level": -1, "transcript": "yo"},
+    ]
+    assert not legacy.exists()
+    assert (temp_store / "interviews.json.migrated").exists()
+
+
+def test_upsert_moves_interview_to_end():
+    store.upsert("alice", "a.mp3", -1, "one")
+    store.upsert("bob", "b.mp3", -1, "two")
+    store.upsert("alice", "a.mp3", -1, "three")
+
+    assert _names() == ["bob", "alice"]
+    assert store.get("alice")["transcript"] == "three"
+
+
+def test_own_writes_invalidate_listing():
+    store.upsert("alice", "a.mp3", -1, "hi")
+    assert store.list_all()[0]["guilt_level"] == -1
+
+    store.set_guilt_level("alice", 70)
+    assert store.list_all()[0]["guilt_level"] == 70
+
+    store.delete("alice")
+    assert store.list_all() == []
+
+
+def test_other_connection_writes_invalidate_listing():
+    store.upsert("alice", "a.mp3", -1, "hi")
+    assert _names() == ["alice"]
+
+    # Another process writing the file moves PRAGMA data_version for us
+    other = sqlite3.connect(store.DB_FILE)
+    with other:
+        other.execute("INSERT INTO interviews VALUES ('bob', 'b.mp3', -1, 'yo')")
+    other.close()
+
+    assert _names() == ["alice", "bob"]
+
+
+def test_listing_is_a_copy():
+    store.upsert("alice", "a.mp3", -1, "hi")
+    store.list_all()[0]["guilt_level"] = 99
+
+    assert store.list_all()[0]["guilt_level"] == -1
+
+
+def test_iter_with_transcripts_skips_empty():
+    store.upsert("alice", "a.mp3", -1, "hi")
+    store.upsert("bob", "b.mp3", -1, "")
+
+    assert store.iter_with_transcripts() == [{"name": "alice", "transcript": "hi"}]
+
+    store.clear()
+    assert store.iter_with_transcripts() == []
@@ -0,0 +1,31 @@
+import io
+
+from PIL import Image
+
+from backend.main import FRAME_MAX_EDGE, frame_cache_key, shrink_frame
+
+
+def _png(size, mode="RGB"):
+    buf = io.BytesIO()
+    Image.new(mode, size).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_shrink_frame_downscales_to_jpeg():
+    out, content_type = shrink_frame(_png((1024, 768)), "image/png")
+    assert content_type == "image/jpeg"
+    assert max(Image.open(io.BytesIO(out)).size) == FRAME_MAX_EDGE
+
+
+def test_shrink_frame_passes_huge_canvas_through_undecoded():
+    # A few KB on the wire, but 25 MP once decoded
+    frame = _png((5000, 5000), mode="1")
+    assert shrink_frame(frame, "image/png") == (frame, "image/png")
+
+
+def test_shrink_frame_passes_undecodable_bytes_through():
+    assert shrink_frame(b"not an image", "image/png") == (b"not an image", "image/png")
+
+
+def test_frame_cache_key_separates_goal_from_frame():
+    assert frame_cache_key("ab", b"c") != frame_cache_key("a", b"bc")
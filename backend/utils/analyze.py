@@ -1,11 +1,17 @@
 import os
-import requests
+import re
 import json
+import orjson
+import asyncio
+import aiohttp
+import ijson
 from dotenv import load_dotenv
 load_dotenv()
 import logging
 import traceback
 
+from backend.utils import cache_utils
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,6 +22,22 @@ SERVER_URL = os.getenv(
     "HACKCLUB_SERVER_URL", "https://ai.hackclub.com/proxy/v1/chat/completions"
 )
 MODEL = os.getenv("HACKCLUB_MODEL", "openai/gpt-5.1")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+
+# Retries for transient upstream errors, applied per request (see _post_with_retry)
+RETRY_STATUSES = {502, 503, 504}
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.3
+
+# Request pieces that never change, built once instead of on every call
+_HACKCLUB_HEADERS = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
+_GEMINI_HEADERS = {"Content-Type": "application/json"}
+_GEMINI_PARAMS = {"key": GEMINI_API_KEY}
+# Stable end-user id sent with OpenAI-style requests (helps provider prefix caching)
+PROVIDER_USER_ID = "midnight-investigator"
+# Seconds to wait on Hack Club before also asking Gemini (see _ask_first_success)
+HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "10"))
 
 # Centralized prompts for easy editing
 PROMPT_GUILT_SYSTEM = (
@@ -29,123 +51,295 @@ PROMPT_SUMMARY_SYSTEM = (
     "{\"ranking\": [{\"name\": string, \"rank\": number, \"reason\": string}], \"summary\": string}. "
     "Do not include a 'summary' field inside ranking items."
 )
+_SYSTEM_MESSAGES = {
+    prompt: {"role": "system", "content": prompt}
+    for prompt in (PROMPT_GUILT_SYSTEM, PROMPT_SUMMARY_SYSTEM)
+}
+_GEMINI_SYSTEM_INSTRUCTIONS = {
+    prompt: {"parts": [{"text": prompt}]}
+    for prompt in (PROMPT_GUILT_SYSTEM, PROMPT_SUMMARY_SYSTEM)
+}
 
 
-def analyze_guilt(transcript):
-    logger.info("analyze_guilt: starting analysis request; server=%s model=%s", SERVER_URL, MODEL)
-    headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
-    payload = {
-        "model": MODEL,
-        "messages": [
-            {"role": "system", "content": PROMPT_GUILT_SYSTEM},
-            {"role": "user", "content": transcript}
+# ijson prefixes of the generated text in each provider's response body
+HACKCLUB_CONTENT_PATH = "choices.item.message.content"
+GEMINI_TEXT_PATH = "candidates.item.content.parts.item.text"
+
+
+async def _read_first(response, path):
+    """Parse the body incrementally as it downloads and return the first value
+    at `path`, instead of buffering the whole document before parsing. The
+    rest of the body is drained so the connection goes back to the pool.
+    """
+    async for value in ijson.items_async(response.content, path):
+        await response.content.read()
+        return value
+    raise ValueError(f"response has no {path}")
+
+
+async def _cached(key, request, *args):
+    """Return the cached answer for `key`, or await `request(*args)` and cache it.
+    Identical prompts get identical answers, so a hit skips the LLM round trip.
+    `request` returns (result, cacheable) so degraded answers are not kept.
+    """
+    cached = await asyncio.to_thread(cache_utils.get_cached, key)
+    if cached is not None:
+        logger.info("llm cache hit: %s", key[:12])
+        return cached
+    result, cacheable = await request(*args)
+    if cacheable:
+        await asyncio.to_thread(cache_utils.save_cached, key, result)
+    return result
+
+
+def _parse_guilt(content):
+    content = content.strip()
+    try:
+        return int(content)
+    except Exception:
+        logger.info("analyze_guilt: non-integer content returned: %s", content)
+        return content
+
+
+_MARKDOWN_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+_CLOSERS = {"{": "}", "[": "]"}
+# How many repair candidates _parse_truncated_json tries before giving up
+_MAX_REPAIR_ATTEMPTS = 8
+# A ranking entry is only usable with all of these (see PROMPT_SUMMARY_SYSTEM)
+_RANKING_FIELDS = {"name", "rank", "reason"}
+
+
+def _parse_truncated_json(text):
+    """Recover the longest valid prefix of a truncated or slightly malformed
+    JSON document (cut off mid-ranking, trailing commas, ...).
+
+    One pass drops trailing commas before a closing bracket and records the
+    points where the document could be cut cleanly: before a comma, just
+    after an opening bracket and just after a closing one, together with the
+    brackets that must be closed there. Candidates are then tried from the
+    longest down, so a repair costs a few parses, not one per character.
+    Raises ValueError if nothing parses.
+    """
+    out = []
+    stack = []
+    cuts = []
+    in_string = escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+            out.append(ch)
+            cuts.append((len(out), "".join(reversed(stack))))
+            continue
+        elif ch in "}]":
+            # [1, 2, ] -> [1, 2]
+            j = len(out)
+            while j and out[j - 1].isspace():
+                j -= 1
+            if j and out[j - 1] == ",":
+                del out[j - 1]
+            if stack:
+                stack.pop()
+            out.append(ch)
+            cuts.append((len(out), "".join(reversed(stack))))
+            continue
+        elif ch == ",":
+            cuts.append((len(out), "".join(reversed(stack))))
+        out.append(ch)
+
+    cleaned = "".join(out)
+    candidates = [cleaned + ('"' if in_string else "") + "".join(reversed(stack))]
+    candidates.extend(cleaned[:cut] + closers for cut, closers in reversed(cuts))
+    for candidate in candidates[:_MAX_REPAIR_ATTEMPTS]:
+        try:
+            return orjson.loads(candidate)
+        except orjson.JSONDecodeError:
+            continue
+    raise ValueError("no parseable JSON prefix")
+
+
+def _drop_partial_ranking(summary):
+    """Remove ranking entries a truncation cut left without all their fields."""
+    if isinstance(summary, dict) and isinstance(summary.get("ranking"), list):
+        summary["ranking"] = [
+            item for item in summary["ranking"]
+            if isinstance(item, dict) and _RANKING_FIELDS <= item.keys()
         ]
-    }
+    return summary
+
+
+def _parse_summary(content):
+    """Return (summary, clean); clean is False for repaired JSON or plain text."""
+    text = content.strip()
+    # Models sometimes wrap the JSON in a markdown fence despite the prompt
+    text = _MARKDOWN_FENCE.sub("", text)
     try:
-        response = requests.post(SERVER_URL, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        guilt_level = None
-        if "choices" in result and result["choices"]:
-            content = result["choices"][0].get("message", {}).get("content", "")
-            try:
-                guilt_level = int(content.strip())
-            except Exception:
-                guilt_level = content.strip()
-                logger.info("analyze_guilt: non-integer content returned: %s", guilt_level)
-        else:
-            guilt_level = result
-        logger.info("analyze_guilt: result=%s", guilt_level)
-        return guilt_level
-    except Exception as e:
-        logger.error("analyze_guilt: hackclub request failed, trying Gemini: %s", e)
-        logger.debug(traceback.format_exc())
-        # Gemini fallback
+        return orjson.loads(text), True
+    except orjson.JSONDecodeError:
+        pass
+    if text.startswith(("{", "[")):
+        # A complete document followed by chatter ("Hope this helps!") is kept as-is
+        try:
+            summary, _end = json.JSONDecoder().raw_decode(text)
+            return summary, True
+        except ValueError:
+            pass
         try:
-            gemini_api_key = os.getenv("GEMINI_API_KEY")
-            if not gemini_api_key:
-                raise RuntimeError("GEMINI_API_KEY not set in environment")
-            gemini_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
-            prompt = PROMPT_GUILT_SYSTEM + "\n" + transcript
-            payload = {
-                "contents": [{"parts": [{"text": prompt}]}]
-            }
-            headers = {"Content-Type": "application/json"}
-            params = {"key": gemini_api_key}
-            response = requests.post(gemini_url, headers=headers, params=params, json=payload, timeout=30)
-            response.raise_for_status()
-            result = response.json()
-            content = ""
-            try:
-                content = result["candidates"][0]["content"]["parts"][0]["text"].strip()
-            except Exception:
-                content = str(result)
-            try:
-                guilt_level = int(content)
-            except Exception:
-                guilt_level = content
-            logger.info("analyze_guilt: Gemini result=%s", guilt_level)
-            return guilt_level
-        except Exception as ge:
-            logger.error("analyze_guilt: Gemini fallback failed: %s", ge)
-            logger.debug(traceback.format_exc())
-            raise RuntimeError(f"Both Hackclub and Gemini API failed: {ge}") from ge
-
-def analyze_summary(summary_prompt):
-    logger.info("analyze_summary: starting analysis request; server=%s model=%s", SERVER_URL, MODEL)
-    headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
+            summary = _drop_partial_ranking(_parse_truncated_json(text))
+            logger.info("analyze_summary: repaired truncated/malformed JSON")
+            return summary, False
+        except ValueError:
+            pass
+    return content.strip(), False
+
+
+async def _post_with_retry(session, url, path, **kwargs):
+    """POST through the shared session and return the first value at `path`.
+    Transient gateway errors are retried with exponential backoff before the
+    failure is surfaced (and the other provider takes over).
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        async with session.post(url, **kwargs) as response:
+            if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                response.raise_for_status()
+                return await _read_first(response, path)
+            logger.info("llm: %s returned %s, retrying", url, response.status)
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+async def _ask_hackclub(session, system_prompt, user_content, timeout):
+    # The system prompt is always the first message, verbatim, and the user
+    # id is fixed, so the provider can reuse its cached prefix across calls.
     payload = {
         "model": MODEL,
         "messages": [
-            {"role": "system", "content": PROMPT_SUMMARY_SYSTEM},
-            {"role": "user", "content": summary_prompt}
-        ]
+            _SYSTEM_MESSAGES[system_prompt],
+            {"role": "user", "content": user_content}
+        ],
+        "user": PROVIDER_USER_ID,
     }
-    try:
-        response = requests.post(SERVER_URL, headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
-        result = response.json()
-        summary = None
-        if "choices" in result and result["choices"]:
-            content = result["choices"][0].get("message", {}).get("content", "")
-            try:
-                summary = json.loads(content)
-            except Exception:
-                summary = content.strip()
+    content = await _post_with_retry(
+        session, SERVER_URL, HACKCLUB_CONTENT_PATH,
+        headers=_HACKCLUB_HEADERS, data=orjson.dumps(payload),
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+    # An empty reply must not win the hedge over a real Gemini answer
+    if not content or not content.strip():
+        raise ValueError("Hack Club returned empty content")
+    return content
+
+
+async def _ask_gemini(session, system_prompt, user_content, timeout):
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY not set in environment")
+    # Sent as systemInstruction (not glued onto the transcript) so every
+    # request starts with the same prefix and hits Gemini's implicit cache.
+    payload = {
+        "systemInstruction": _GEMINI_SYSTEM_INSTRUCTIONS[system_prompt],
+        "contents": [{"parts": [{"text": user_content}]}],
+    }
+    content = await _post_with_retry(
+        session, GEMINI_URL, GEMINI_TEXT_PATH,
+        headers=_GEMINI_HEADERS, params=_GEMINI_PARAMS, data=orjson.dumps(payload),
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+    if not content or not content.strip():
+        raise ValueError("Gemini returned empty content")
+    return content.strip()
+
+
+def _log_failure(label, provider, error):
+    logger.error("%s: %s request failed: %s", label, provider, error)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("".join(traceback.format_exception(type(error), error, error.__traceback__)))
+
+
+def _collect(label, tasks, done):
+    """Return (winner, error) for a batch of finished tasks. Every failure is
+    retrieved and logged, even when another task in the batch succeeded, so
+    asyncio never reports an exception as unretrieved.
+    """
+    winner = error = None
+    for task in done:
+        if task.exception() is None:
+            winner = winner or (tasks[task], task.result())
         else:
-            summary = result
-        logger.info("analyze_summary: result type=%s", type(summary))
-        return summary
-    except Exception as e:
-        logger.error("analyze_summary: hackclub request failed, trying Gemini: %s", e)
-        logger.debug(traceback.format_exc())
-        # Gemini fallback
-        try:
-            gemini_api_key = os.getenv("GEMINI_API_KEY")
-            if not gemini_api_key:
-                raise RuntimeError("GEMINI_API_KEY not set in environment")
-            gemini_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
-            prompt = PROMPT_SUMMARY_SYSTEM + "\n" + summary_prompt
-            payload = {
-                "contents": [{"parts": [{"text": prompt}]}]
-            }
-            headers = {"Content-Type": "application/json"}
-            params = {"key": gemini_api_key}
-            response = requests.post(gemini_url, headers=headers, params=params, json=payload, timeout=60)
-            response.raise_for_status()
-            result = response.json()
-            content = ""
-            try:
-                content = result["candidates"][0]["content"]["parts"][0]["text"].strip()
-            except Exception:
-                content = str(result)
-            try:
-                summary = json.loads(content)
-            except Exception:
-                summary = content
-            logger.info("analyze_summary: Gemini result type=%s", type(summary))
-            return summary
-        except Exception as ge:
-            logger.error("analyze_summary: Gemini fallback failed: %s", ge)
-            logger.debug(traceback.format_exc())
-            raise RuntimeError(f"Both Hackclub and Gemini API failed: {ge}") from ge
+            error = task.exception()
+            _log_failure(label, tasks[task], error)
+    return winner, error
+
+
+async def _ask_first_success(label, system_prompt, user_content, session, timeout):
+    """Hedged request: ask Hack Club, and if it hasn't answered within
+    HEDGE_DELAY seconds (or has already failed) ask Gemini as well. Whichever
+    succeeds first wins and the other request is cancelled.
+    Returns (provider, content).
+    """
+    logger.info("%s: starting analysis request; server=%s model=%s", label, SERVER_URL, MODEL)
+    tasks = {
+        asyncio.ensure_future(_ask_hackclub(session, system_prompt, user_content, timeout)): "Hackclub"
+    }
+    error = None
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=HEDGE_DELAY)
+        winner, error = _collect(label, tasks, done)
+        if winner:
+            return winner
+        if pending:
+            logger.info("%s: hackclub slower than %ss, also trying Gemini", label, HEDGE_DELAY)
+        gemini = asyncio.ensure_future(_ask_gemini(session, system_prompt, user_content, timeout))
+        tasks[gemini] = "Gemini"
+        pending.add(gemini)
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner, failure = _collect(label, tasks, done)
+            error = failure or error
+            if winner:
+                return winner
+    finally:
+        for task in tasks:
+            task.cancel()
+    raise RuntimeError(f"Both Hackclub and Gemini API failed: {error}") from error
+
+
+async def _request_guilt(session, transcript):
+    provider, content = await _ask_first_success(
+        "analyze_guilt", PROMPT_GUILT_SYSTEM, transcript, session, timeout=30
+    )
+    guilt_level = _parse_guilt(content)
+    logger.info("analyze_guilt: %s result=%s", provider, guilt_level)
+    return guilt_level, isinstance(guilt_level, int)
+
+
+async def _request_summary(session, summary_prompt):
+    provider, content = await _ask_first_success(
+        "analyze_summary", PROMPT_SUMMARY_SYSTEM, summary_prompt, session, timeout=60
+    )
+    summary, clean = _parse_summary(content)
+    logger.info("analyze_summary: %s result type=%s", provider, type(summary))
+    return summary, clean and isinstance(summary, dict)
+
+
+async def analyze_guilt(session: aiohttp.ClientSession, transcript):
+    key = cache_utils.cache_key(
+        MODEL,
+        [_SYSTEM_MESSAGES[PROMPT_GUILT_SYSTEM], {"role": "user", "content": transcript}],
+    )
+    return await _cached(key, _request_guilt, session, transcript)
+
+
+async def analyze_summary(session: aiohttp.ClientSession, summary_prompt):
+    key = cache_utils.cache_key(
+        MODEL,
+        [_SYSTEM_MESSAGES[PROMPT_SUMMARY_SYSTEM], {"role": "user", "content": summary_prompt}],
+    )
+    return await _cached(key, _request_summary, session, summary_prompt)
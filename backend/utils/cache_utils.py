@@ -0,0 +1,93 @@
+import time
+import orjson
+import sqlite3
+import hashlib
+import threading
+import logging
+import traceback
+
+CACHE_DB = "backend/llm_cache.db"
+MAX_ENTRIES = 10_000
+TTL_SECONDS = 24 * 60 * 60
+
+_conn = None
+_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+
+def get_data_hash(data) -> str:
+    """SHA-256 hex digest of a str or bytes-like object (bytes are hashed as-is).
+    Cache keys aren't security-sensitive, hence usedforsecurity=False.
+    """
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data, usedforsecurity=False).hexdigest()
+
+
+def cache_key(model, messages, temperature=0) -> str:
+    """Stable key for an LLM request: same model + messages -> same key."""
+    payload = {"model": model, "messages": messages, "temperature": temperature}
+    return get_data_hash(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS))
+
+
+def _connect():
+    """Open the shared SQLite connection on first use. Callers must hold `_lock`."""
+    global _conn
+    if _conn is not None:
+        return _conn
+
+    conn = sqlite3.connect(CACHE_DB, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS llm_cache("
+        "key TEXT PRIMARY KEY, value BLOB, created REAL, last_used REAL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache(last_used)")
+    _conn = conn
+    return _conn
+
+
+def get_cached(key):
+    """Return the cached value for `key`, or None if missing or expired."""
+    now = time.time()
+    try:
+        with _lock:
+            conn = _connect()
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND created > ?",
+                (key, now - TTL_SECONDS),
+            ).fetchone()
+            if row is None:
+                return None
+            with conn:
+                conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        return orjson.loads(row[0])
+    except Exception as e:
+        logger.error("cache_utils: lookup failed: %s", e)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(traceback.format_exc())
+        return None
+
+
+def save_cached(key, value):
+    now = time.time()
+    try:
+        with _lock:
+            conn = _connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                    (key, orjson.dumps(value), now, now),
+                )
+                # Drop expired rows, then the least recently used beyond the cap.
+                conn.execute("DELETE FROM llm_cache WHERE created <= ?", (now - TTL_SECONDS,))
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key NOT IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT ?)",
+                    (MAX_ENTRIES,),
+                )
+    except Exception as e:
+        logger.error("cache_utils: failed to store entry: %s", e)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(traceback.format_exc())
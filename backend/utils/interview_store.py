@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import threading
+import logging
+import traceback
+
+from backend.utils.interview_files import DATA_FILE, load_interviews
+
+DB_FILE = "backend/interviews.db"
+
+_conn = None
+_lock = threading.Lock()
+# Parsed listing, reused until a write lands. `_rows_version` is SQLite's
+# data_version, which also changes when another process commits.
+_rows_cache = None
+_rows_version = None
+logger = logging.getLogger(__name__)
+
+
+def _connect():
+    """Open the shared SQLite connection on first use and create the schema.
+    Callers must hold `_lock`.
+    """
+    global _conn
+    if _conn is not None:
+        return _conn
+
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS interviews("
+        "name TEXT PRIMARY KEY, mp3_path TEXT, guilt_level INT, transcript TEXT)"
+    )
+    _migrate_legacy_json(conn)
+    _conn = conn
+    return _conn
+
+
+def _migrate_legacy_json(conn):
+    """One-shot import of the old interviews.json into an empty table. The
+    JSON file is renamed afterwards so it is never imported twice.
+    """
+    if not os.path.exists(DATA_FILE):
+        return
+    if conn.execute("SELECT 1 FROM interviews LIMIT 1").fetchone():
+        return
+
+    rows = [
+        (iv["name"], iv.get("mp3_path"), iv.get("guilt_level", -1), iv.get("transcript"))
+        for iv in load_interviews()
+        if isinstance(iv, dict) and iv.get("name")
+    ]
+    try:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO interviews VALUES (?, ?, ?, ?)", rows)
+        os.replace(DATA_FILE, DATA_FILE + ".migrated")
+        logger.info("interview_store: migrated %d interviews from %s", len(rows), DATA_FILE)
+    except Exception as e:
+        logger.error("interview_store: legacy migration failed: %s", e)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(traceback.format_exc())
+
+
+def _cached_rows():
+    """Return the cached listing, re-reading the table only if it changed.
+    Callers must hold `_lock` and must not mutate the returned dicts.
+    """
+    global _rows_cache, _rows_version
+    conn = _connect()
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if _rows_cache is None or version != _rows_version:
+        rows = conn.execute("SELECT * FROM interviews ORDER BY rowid").fetchall()
+        _rows_cache = [dict(row) for row in rows]
+        _rows_version = version
+    return _rows_cache
+
+
+def _invalidate():
+    # data_version does not move for our own connection's commits.
+    global _rows_cache
+    _rows_cache = None
+
+
+def list_all():
+    with _lock:
+        return [dict(iv) for iv in _cached_rows()]
+
+
+def get(name):
+    with _lock:
+        row = _connect().execute("SELECT * FROM interviews WHERE name = ?", (name,)).fetchone()
+    return dict(row) if row else None
+
+
+def iter_with_transcripts():
+    with _lock:
+        return [
+            {"name": iv["name"], "transcript": iv["transcript"]}
+            for iv in _cached_rows()
+            if iv["transcript"]
+        ]
+
+
+def upsert(name, mp3_path, guilt_level, transcript):
+    # REPLACE (rather than ON CONFLICT UPDATE) moves a re-added interview to
+    # the end of the listing, same as the old JSON store did.
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO interviews VALUES (?, ?, ?, ?)",
+                (name, mp3_path, guilt_level, transcript),
+            )
+        _invalidate()
+
+
+def set_guilt_level(name, guilt_level):
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute(
+                "UPDATE interviews SET guilt_level = ? WHERE name = ?", (guilt_level, name)
+            )
+        _invalidate()
+
+
+def delete(name):
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("DELETE FROM interviews WHERE name = ?", (name,))
+        _invalidate()
+
+
+def clear():
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("DELETE FROM interviews")
+        _invalidate()